@@ -1,21 +1,47 @@
 # tests/conftest.py
+from collections import defaultdict
+
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from _pytest.config import Config
-from app.main import app
 from app.core.database import Base, get_db
+from app.infra.events.rabbitmq import rabbitmq
+from app.models.product_models import Product
 
 
 # --------------------------------------------------------------------
 # DB SQLite en mémoire pour les tests
 # --------------------------------------------------------------------
-engine = create_engine("sqlite:///:memory:", future=True)
+# StaticPool : une seule connexion partagée -> la base en mémoire survit entre checkouts.
+# Base propre au processus : chaque worker pytest-xdist (-n auto) a la sienne.
+engine = create_engine(
+    "sqlite://",
+    connect_args={"check_same_thread": False},  # TestClient exécute les routes dans un autre thread
+    poolclass=StaticPool,
+    future=True,
+)
 TestingSessionLocal = sessionmaker(
-    bind=engine, autoflush=False, autocommit=False, future=True
+    autoflush=False,
+    autocommit=False,
+    future=True,
+    join_transaction_mode="create_savepoint",  # commit() des services -> RELEASE SAVEPOINT
 )
 
+
+# pysqlite gère mal BEGIN/SAVEPOINT : on laisse SQLAlchemy piloter la transaction
+@event.listens_for(engine, "connect")
+def _sqlite_disable_pysqlite_begin(dbapi_connection, connection_record):
+    dbapi_connection.isolation_level = None
+
+
+@event.listens_for(engine, "begin")
+def _sqlite_emit_begin(conn):
+    conn.exec_driver_sql("BEGIN")
+
+
 def pytest_configure(config: Config):
     """
     Déclare les marqueurs personnalisés pour éviter les warnings 'Unknown mark'
@@ -26,45 +52,115 @@ def pytest_configure(config: Config):
 
 @pytest.fixture(scope="session", autouse=True)
 def setup_database():
-    """Créer et détruire les tables pour toute la session de tests"""
+    """Créer et détruire les tables pour toute la session de tests (DDL une seule fois)"""
     Base.metadata.create_all(bind=engine)
+    assert Product.__table__.name in inspect(engine).get_table_names()
     yield
     Base.metadata.drop_all(bind=engine)
 
 
 @pytest.fixture
 def session():
-    """Session DB propre par test"""
-    db = TestingSessionLocal()
+    """
+    Session DB isolée par test :
+    - une connexion + transaction externe ouverte pour le test
+    - les commit() applicatifs deviennent des SAVEPOINT
+    - rollback de la transaction externe en fin de test (aucun DELETE/DDL)
+    """
+    conn = engine.connect()
+    trans = conn.begin()
+    db = TestingSessionLocal(bind=conn)
     try:
         yield db
     finally:
         db.close()
+        trans.rollback()
+        conn.close()
+
+
+@pytest.fixture
+def seed(session):
+    """
+    Insère des produits directement en base (sans passer par POST) :
+    seed([{"sku": ..., "name": ..., "price": ..., "quantity": ...}, ...])
+    """
+    def _seed(rows):
+        session.bulk_insert_mappings(Product, rows)
+        session.flush()
+    return _seed
 
 
 # --------------------------------------------------------------------
 # Patcher RabbitMQ pour ne rien envoyer
 # --------------------------------------------------------------------
-@pytest.fixture
-def patch_rabbitmq(monkeypatch):
-    async def fake_publish_message(*args, **kwargs):
-        return None
+# Événements publiés, indexés par routing key -> liste des ids produits
+# (attribut de module : local au processus, donc à chaque worker xdist)
+captured_events = defaultdict(list)
 
-    monkeypatch.setattr(
-        "app.infra.events.rabbitmq.RabbitMQ.publish_message", fake_publish_message
-    )
+
+@pytest.fixture(scope="session")
+def patch_rabbitmq():
+    # Un seul patch pour toute la session : on se contente d'enregistrer l'id.
+    # On patche l'instance utilisée par l'app (pas la classe) pour laisser
+    # les tests unitaires de RabbitMQ.publish_message intacts.
+    async def fake_publish_message(routing_key, message, *args, **kwargs):
+        captured_events[routing_key].append(message.get("id"))
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(rabbitmq, "publish_message", fake_publish_message)
+        yield
+
+
+@pytest.fixture
+def events_log(patch_rabbitmq):
+    """Événements publiés pendant le test : events_log["product.created"] -> [ids]"""
+    captured_events.clear()
+    return captured_events
 
 # --------------------------------------------------------------------
 # Fournir un client FastAPI avec DB testée
 # --------------------------------------------------------------------
+@pytest.fixture(scope="session")
+def fastapi_app():
+    """
+    Application FastAPI, importée à la première utilisation :
+    les tests purement unitaires ne chargent pas app.main (routes, Prometheus...).
+    """
+    from app.main import app
+    return app
+
+
+@pytest.fixture(scope="session")
+def test_client(fastapi_app, patch_rabbitmq):
+    """
+    TestClient unique pour la session, ouvert une seule fois (`with`) :
+    un seul portal/thread anyio réutilisé par toutes les requêtes,
+    lifespan exécuté une fois au démarrage et une fois à l'arrêt.
+    """
+    from app import main as app_main
+
+    async def fake_connect(): return None
+    async def fake_disconnect(): return None
+    async def fake_start_consumer(*args, **kwargs): return None
+
+    with pytest.MonkeyPatch.context() as mp:
+        # Lifespan sans infra : pas de broker, et SELECT 1 / create_all
+        # sur l'engine de test (idempotent : les tables existent déjà)
+        mp.setattr(rabbitmq, "connect", fake_connect)
+        mp.setattr(rabbitmq, "disconnect", fake_disconnect)
+        mp.setattr(app_main, "start_consumer", fake_start_consumer)
+        mp.setattr(app_main, "engine", engine)
+        with TestClient(fastapi_app) as c:
+            yield c
+
+
 @pytest.fixture
-def client(session, monkeypatch):
-    # Override get_db pour injecter notre session SQLite in-memory
+def client(fastapi_app, session, test_client):
+    # Override get_db : toutes les requêtes du test partagent la session
+    # transactionnelle ; sa fermeture reste à la charge de la fixture `session`.
     def override_get_db():
-        try:
-            yield session
-        finally:
-            session.close()
+        yield session
 
-    app.dependency_overrides[get_db] = override_get_db
-    return TestClient(app)
+    fastapi_app.dependency_overrides[get_db] = override_get_db
+    yield test_client
+    fastapi_app.dependency_overrides.pop(get_db, None)
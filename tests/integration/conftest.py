@@ -0,0 +1,26 @@
+# tests/integration/conftest.py
+import pytest
+
+from app.security.security import AuthContext, require_read, require_write
+
+
+# --------------------------------------------------------------------
+# Patch Security (client + DB : fixtures de tests/conftest.py)
+# --------------------------------------------------------------------
+@pytest.fixture(scope="module", autouse=True)
+def security_overrides(fastapi_app):
+    # Fake sécurité : AuthContext toujours accepté (posé une fois par module).
+    # Surcharger require_read/require_write court-circuite require_user et HTTPBearer.
+    fake_ctx = AuthContext(
+        user="test-user",
+        email="test@example.com",
+        roles=["product:read", "product:write"],
+    )
+    fastapi_app.dependency_overrides[require_read] = lambda: fake_ctx
+    fastapi_app.dependency_overrides[require_write] = lambda: fake_ctx
+
+    yield
+
+    # Nettoyage overrides (seulement les clés posées ici)
+    fastapi_app.dependency_overrides.pop(require_read, None)
+    fastapi_app.dependency_overrides.pop(require_write, None)
@@ -1,50 +1,22 @@
 import pytest
-from fastapi.testclient import TestClient
-
-from app.main import app
-from app.core.database import Base, engine
-from app.security.security import AuthContext, require_read, require_write
 
 pytestmark = pytest.mark.acceptance
 
 
-@pytest.fixture(autouse=True)
-def setup_db():
-    Base.metadata.drop_all(bind=engine)
-    Base.metadata.create_all(bind=engine)
-    yield
-    Base.metadata.drop_all(bind=engine)
-
-
-@pytest.fixture
-def client(patch_rabbitmq):
-    # Mock Security Dependencies
-    fake_ctx = AuthContext(
-        user="test-user",
-        email="test@example.com",
-        roles=["product:read", "product:write"],
-    )
-    app.dependency_overrides[require_read] = lambda: fake_ctx
-    app.dependency_overrides[require_write] = lambda: fake_ctx
-
-    yield TestClient(app)
-
-    # Clean up
-    app.dependency_overrides.clear()
-
-
-def test_full_product_lifecycle(client):
+def test_full_product_lifecycle(client, events_log):
     # 1. Création
     payload = {"sku": "LIFE1", "name": "Lifecycle", "price": 50.0, "quantity": 10}
     res = client.post("/products/", json=payload)
     assert res.status_code == 201
     prod = res.json()
     pid = prod["id"]
+    assert pid in events_log["product.created"]
 
     # 2. Update
     res2 = client.put(f"/products/{pid}", json={"name": "Lifecycle Updated"})
     assert res2.status_code == 200
     assert res2.json()["name"] == "Lifecycle Updated"
+    assert pid in events_log["product.updated"]
 
     # 3. Ajustement de stock (delta dans le body)
     res3 = client.patch(f"/products/{pid}/stock", json={"delta": -2})
@@ -55,9 +27,11 @@ def test_full_product_lifecycle(client):
     res4 = client.patch(f"/products/{pid}/active", json={"is_active": False})
     assert res4.status_code == 200
     assert res4.json()["is_active"] is False
+    assert pid in events_log["product.deactivated"]
 
     # 5. Suppression
     res5 = client.delete(f"/products/{pid}")
     assert res5.status_code == 200
+    assert pid in events_log["product.deleted"]
     res6 = client.get(f"/products/{pid}")
     assert res6.status_code == 404
\ No newline at end of file
@@ -1,8 +1,50 @@
+import logging
+
 import pytest
 from unittest.mock import AsyncMock, MagicMock
 import app.infra.events.handlers as handlers
 from app.services import product_service
 
+# Vraie factory, capturée avant le patch module-scoped ci-dessous
+_real_get_service = handlers._get_service
+
+
+# =====================================================
+# FIXTURES
+# =====================================================
+
+@pytest.fixture(autouse=True)
+def configure_logging(caplog):
+    # caplog ne voit les logs INFO que si le niveau est configuré :
+    # ne pas dépendre de setup_logging() (import de app.main ailleurs)
+    caplog.set_level(logging.INFO)
+
+
+@pytest.fixture(scope="module")
+def fake_svc():
+    """
+    Un seul AsyncMock pour le module (construction coûteuse).
+    get (synchrone) et mq sont attachés une fois, en enfants du mock.
+    """
+    svc = AsyncMock()
+    svc.get = MagicMock()
+    svc.mq = AsyncMock()
+    return svc
+
+
+@pytest.fixture(scope="module", autouse=True)
+def patch_get_service(fake_svc):
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(handlers, "_get_service", lambda db: fake_svc)
+        yield
+
+
+@pytest.fixture(autouse=True)
+def reset_fake_svc(fake_svc):
+    # Repart d'un mock vierge (enfants get/mq compris) : appels, return_value, side_effect.
+    # Les tests configurent get.return_value, sans remplacer get/mq.
+    fake_svc.reset_mock(return_value=True, side_effect=True)
+
 
 # =====================================================
 # CLEAN ITEMS / DELTAS
@@ -38,10 +80,8 @@ def test_clean_deltas_invalid(caplog):
 # =====================================================
 
 @pytest.mark.asyncio
-async def test_handle_order_items_delta_success(monkeypatch):
-    fake_svc = AsyncMock()
-    fake_svc.get = MagicMock(return_value=MagicMock(quantity=10))
-    monkeypatch.setattr(handlers, "_get_service", lambda db: fake_svc)
+async def test_handle_order_items_delta_success(fake_svc):
+    fake_svc.get.return_value = MagicMock(quantity=10)
 
     payload = {"order_id": 1, "deltas": [{"product_id": 101, "delta": 3}, {"product_id": 101, "delta": -1}]}
     await handlers.handle_order_items_delta(payload, db=MagicMock())
@@ -51,10 +91,8 @@ async def test_handle_order_items_delta_success(monkeypatch):
 
 
 @pytest.mark.asyncio
-async def test_handle_order_items_delta_insufficient(monkeypatch, caplog):
-    fake_svc = AsyncMock()
-    fake_svc.get = MagicMock(return_value=MagicMock(quantity=1))
-    monkeypatch.setattr(handlers, "_get_service", lambda db: fake_svc)
+async def test_handle_order_items_delta_insufficient(fake_svc, caplog):
+    fake_svc.get.return_value = MagicMock(quantity=1)
 
     payload = {"order_id": 1, "deltas": [{"product_id": 101, "delta": 5}]}
     await handlers.handle_order_items_delta(payload, db=MagicMock())
@@ -64,10 +102,7 @@ async def test_handle_order_items_delta_insufficient(monkeypatch, caplog):
 
 
 @pytest.mark.asyncio
-async def test_handle_order_items_delta_no_deltas(monkeypatch, caplog):
-    fake_svc = AsyncMock()
-    monkeypatch.setattr(handlers, "_get_service", lambda db: fake_svc)
-
+async def test_handle_order_items_delta_no_deltas(fake_svc, caplog):
     await handlers.handle_order_items_delta({"order_id": 42, "deltas": []}, db=MagicMock())
     fake_svc.adjust_stock.assert_not_called()
     assert "[order.items_delta] 42 sans delta" in caplog.text
@@ -78,10 +113,7 @@ async def test_handle_order_items_delta_no_deltas(monkeypatch, caplog):
 # =====================================================
 
 @pytest.mark.asyncio
-async def test_handle_order_cancelled_success(monkeypatch):
-    fake_svc = AsyncMock()
-    monkeypatch.setattr(handlers, "_get_service", lambda db: fake_svc)
-
+async def test_handle_order_cancelled_success(fake_svc):
     payload = {"order_id": 1, "items": [{"product_id": 101, "quantity": 3}]}
     await handlers.handle_order_cancelled(payload, db=MagicMock())
 
@@ -89,10 +121,7 @@ async def test_handle_order_cancelled_success(monkeypatch):
 
 
 @pytest.mark.asyncio
-async def test_handle_order_cancelled_no_items(monkeypatch, caplog):
-    fake_svc = AsyncMock()
-    monkeypatch.setattr(handlers, "_get_service", lambda db: fake_svc)
-
+async def test_handle_order_cancelled_no_items(fake_svc, caplog):
     await handlers.handle_order_cancelled({"order_id": 1, "items": []}, db=MagicMock())
     fake_svc.adjust_stock.assert_not_called()
 
@@ -112,10 +141,7 @@ async def test_handle_order_rejected_logs(caplog):
 # =====================================================
 
 @pytest.mark.asyncio
-async def test_handle_order_deleted_success(monkeypatch):
-    fake_svc = AsyncMock()
-    monkeypatch.setattr(handlers, "_get_service", lambda db: fake_svc)
-
+async def test_handle_order_deleted_success(fake_svc):
     payload = {"order_id": 1, "status": "cancelled", "items": [{"product_id": 101, "quantity": 2}]}
     await handlers.handle_order_deleted(payload, db=MagicMock())
 
@@ -123,10 +149,7 @@ async def test_handle_order_deleted_success(monkeypatch):
 
 
 @pytest.mark.asyncio
-async def test_handle_order_deleted_rejected(monkeypatch):
-    fake_svc = AsyncMock()
-    monkeypatch.setattr(handlers, "_get_service", lambda db: fake_svc)
-
+async def test_handle_order_deleted_rejected(fake_svc):
     payload = {"order_id": 1, "status": "rejected", "items": [{"product_id": 101, "quantity": 2}]}
     await handlers.handle_order_deleted(payload, db=MagicMock())
 
@@ -134,10 +157,7 @@ async def test_handle_order_deleted_rejected(monkeypatch):
 
 
 @pytest.mark.asyncio
-async def test_handle_order_deleted_no_items(monkeypatch):
-    fake_svc = AsyncMock()
-    monkeypatch.setattr(handlers, "_get_service", lambda db: fake_svc)
-
+async def test_handle_order_deleted_no_items(fake_svc):
     await handlers.handle_order_deleted({"order_id": 1, "status": "cancelled", "items": []}, db=MagicMock())
     fake_svc.adjust_stock.assert_not_called()
 
@@ -147,10 +167,7 @@ async def test_handle_order_deleted_no_items(monkeypatch):
 # =====================================================
 
 @pytest.mark.asyncio
-async def test_handle_order_updated_cancelled(monkeypatch, caplog):
-    fake_svc = AsyncMock()
-    monkeypatch.setattr(handlers, "_get_service", lambda db: fake_svc)
-
+async def test_handle_order_updated_cancelled(fake_svc, caplog):
     payload = {"order_id": 1, "status": "cancelled", "items": [{"product_id": 101, "quantity": 4}]}
     await handlers.handle_order_updated(payload, db=MagicMock())
 
@@ -159,10 +176,7 @@ async def test_handle_order_updated_cancelled(monkeypatch, caplog):
 
 
 @pytest.mark.asyncio
-async def test_handle_order_updated_other_status(monkeypatch, caplog):
-    fake_svc = AsyncMock()
-    monkeypatch.setattr(handlers, "_get_service", lambda db: fake_svc)
-
+async def test_handle_order_updated_other_status(fake_svc, caplog):
     payload = {"order_id": 1, "status": "completed", "items": []}
     await handlers.handle_order_updated(payload, db=MagicMock())
 
@@ -171,10 +185,7 @@ async def test_handle_order_updated_other_status(monkeypatch, caplog):
 
 
 @pytest.mark.asyncio
-async def test_handle_order_updated_no_status(monkeypatch, caplog):
-    fake_svc = AsyncMock()
-    monkeypatch.setattr(handlers, "_get_service", lambda db: fake_svc)
-
+async def test_handle_order_updated_no_status(fake_svc, caplog):
     payload = {"order_id": 1}
     await handlers.handle_order_updated(payload, db=MagicMock())
 
@@ -187,7 +198,7 @@ async def test_handle_order_updated_no_status(monkeypatch, caplog):
 # =====================================================
 
 def test__get_service_returns_product_service():
-    svc = handlers._get_service(MagicMock())
+    svc = _real_get_service(MagicMock())
     assert isinstance(svc, product_service.ProductService)
 
 
@@ -196,11 +207,7 @@ def test__get_service_returns_product_service():
 # =====================================================
 
 @pytest.mark.asyncio
-async def test_handle_order_price_request_invalid_payload(monkeypatch, caplog):
-    fake_svc = AsyncMock()
-    fake_svc.mq = AsyncMock()
-    monkeypatch.setattr(handlers, "_get_service", lambda db: fake_svc)
-
+async def test_handle_order_price_request_invalid_payload(fake_svc, caplog):
     payload = {"items": []}  # pas de customer_id
     await handlers.handle_order_price_request(payload, db=MagicMock())
 
@@ -209,11 +216,8 @@ async def test_handle_order_price_request_invalid_payload(monkeypatch, caplog):
 
 
 @pytest.mark.asyncio
-async def test_handle_order_price_request_success(monkeypatch):
-    fake_svc = AsyncMock()
-    fake_svc.get = MagicMock(return_value=MagicMock(price=5.5))
-    fake_svc.mq = AsyncMock()
-    monkeypatch.setattr(handlers, "_get_service", lambda db: fake_svc)
+async def test_handle_order_price_request_success(fake_svc):
+    fake_svc.get.return_value = MagicMock(price=5.5)
 
     payload = {
         "order_id": 99,
@@ -241,11 +245,8 @@ async def test_handle_order_price_request_success(monkeypatch):
 # =====================================================
 
 @pytest.mark.asyncio
-async def test_handle_order_ready_for_stock_success(monkeypatch):
-    fake_svc = AsyncMock()
-    fake_svc.get = MagicMock(return_value=MagicMock(quantity=10))
-    fake_svc.mq = AsyncMock()
-    monkeypatch.setattr(handlers, "_get_service", lambda db: fake_svc)
+async def test_handle_order_ready_for_stock_success(fake_svc):
+    fake_svc.get.return_value = MagicMock(quantity=10)
 
     payload = {
         "order_id": 123,
@@ -260,22 +261,15 @@ async def test_handle_order_ready_for_stock_success(monkeypatch):
 
 
 @pytest.mark.asyncio
-async def test_handle_order_ready_for_stock_no_items(monkeypatch, caplog):
-    fake_svc = AsyncMock()
-    fake_svc.mq = AsyncMock()
-    monkeypatch.setattr(handlers, "_get_service", lambda db: fake_svc)
-
+async def test_handle_order_ready_for_stock_no_items(fake_svc, caplog):
     await handlers.handle_order_ready_for_stock({"order_id": 1, "customer_id": 2, "items": []}, db=MagicMock())
     fake_svc.adjust_stock.assert_not_called()
     assert "[order.customer_validated] payload invalide" in caplog.text
 
 
 @pytest.mark.asyncio
-async def test_handle_order_ready_for_stock_insufficient(monkeypatch, caplog):
-    fake_svc = AsyncMock()
-    fake_svc.get = MagicMock(return_value=MagicMock(quantity=2))
-    fake_svc.mq = AsyncMock()
-    monkeypatch.setattr(handlers, "_get_service", lambda db: fake_svc)
+async def test_handle_order_ready_for_stock_insufficient(fake_svc, caplog):
+    fake_svc.get.return_value = MagicMock(quantity=2)
 
     payload = {
         "order_id": 5,
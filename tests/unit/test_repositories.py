@@ -70,7 +70,7 @@ def test_list_products_filters_and_sort(session):
         q="app", category="C", brand="B", min_price=1, max_price=10,
         only_active=True, sort_by="name", sort_dir="asc", skip=0, limit=10,
     )
-    assert any(r.name == "Apple" for r in rows)
+    assert [r.name for r in rows] == ["Apple"]
 
 
 def test_update_product_ok(session):
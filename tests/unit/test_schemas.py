@@ -8,6 +8,9 @@ from app.schemas.product_schema import (
     ProductBase, ProductCreate, ProductUpdate, ProductResponse, StockAdjust, ActiveToggle
 )
 
+# Payload minimal valide, partagé par les tests paramétrés (copié via {**VALID_CREATE, ...})
+VALID_CREATE = dict(sku="SKU1", name="Produit", price=1.0, quantity=1)
+
 
 # ----- ProductBase / ProductCreate -----
 def test_product_create_valid():
@@ -32,10 +35,8 @@ def test_product_create_valid():
     ("name", ""),  # trop court
 ])
 def test_product_create_string_constraints(field, value):
-    data = dict(sku="SKU1", name="Produit", price=1.0, quantity=1)
-    data[field] = value
     with pytest.raises(ValidationError):
-        ProductCreate(**data)
+        ProductCreate(**{**VALID_CREATE, field: value})
 
 
 @pytest.mark.parametrize("field,value", [
@@ -43,12 +44,11 @@ def test_product_create_string_constraints(field, value):
     ("quantity", -5),
     ("vat_rate", -0.1),
     ("vat_rate", 1.1),
+    ("quantity", "abc"),  # mauvais type
 ])
 def test_product_create_numeric_constraints(field, value):
-    data = dict(sku="SKU1", name="Produit", price=1.0, quantity=1)
-    data[field] = value
     with pytest.raises(ValidationError):
-        ProductCreate(**data)
+        ProductCreate(**{**VALID_CREATE, field: value})
 
 
 @pytest.mark.parametrize("field,value", [
@@ -56,25 +56,24 @@ def test_product_create_numeric_constraints(field, value):
     ("price", math.inf),
     ("price", -math.inf),
     ("vat_rate", math.nan),
+    ("price", "Infinity"),  # string convertie en float('inf') par Pydantic
 ])
 def test_product_create_non_finite(field, value):
-    data = dict(sku="SKU1", name="Produit", price=1.0, quantity=1)
-    data[field] = value
     with pytest.raises(ValidationError):
-        ProductCreate(**data)
+        ProductCreate(**{**VALID_CREATE, field: value})
 
 
 @pytest.mark.parametrize("field,max_len", [
+    ("sku", 64),
+    ("name", 255),
     ("description", 1000),
     ("unit", 32),
     ("brand", 128),
     ("category", 128),
 ])
 def test_product_create_field_too_long(field, max_len):
-    data = dict(sku="SKU1", name="Produit", price=1.0, quantity=1)
-    data[field] = "x" * (max_len + 1)
     with pytest.raises(ValidationError):
-        ProductCreate(**data)
+        ProductCreate(**{**VALID_CREATE, field: "x" * (max_len + 1)})
 
 
 # ----- ProductUpdate -----
@@ -1,6 +1,5 @@
 # tests/test_api.py
 import pytest
-from fastapi.testclient import TestClient
 from unittest.mock import AsyncMock
 from datetime import datetime, timezone
 
@@ -10,10 +9,10 @@ from app.security import security
 import app.api.routes.product as product_routes
 from app.schemas.product_schema import ProductResponse
 
-# This client fixture will be used by all tests in this file.
-# It handles all the setup and teardown for each test.
-@pytest.fixture
-def client(patch_rabbitmq):
+# Per-test overrides: a fresh mock service and a fake user context.
+# Only the keys set here are restored afterwards.
+@pytest.fixture(autouse=True)
+def overrides():
     # 1. Create a mock for the ProductService
     mock_svc = AsyncMock(spec=product_service.ProductService)
     
@@ -41,164 +40,170 @@ def client(patch_rabbitmq):
         roles=["product:read", "product:write"],
     )
 
-    # 3. Apply the dependency overrides to the app
-    app.dependency_overrides = {
+    # 3. Apply the dependency overrides to the app, remembering previous values.
+    #    Overriding require_read/require_write bypasses require_user and HTTPBearer.
+    new_overrides = {
         product_routes.get_product_service: lambda: mock_svc,
-        security.require_user: lambda: fake_user_context,
         security.require_read: lambda: fake_user_context,
         security.require_write: lambda: fake_user_context,
     }
+    saved = {k: app.dependency_overrides[k] for k in new_overrides if k in app.dependency_overrides}
+    app.dependency_overrides.update(new_overrides)
 
-    # 4. Yield the TestClient for the test to run
-    yield TestClient(app)
+    yield
 
-    # 5. Clean up the overrides after the test is done
-    app.dependency_overrides = {}
+    # 4. Restore only the keys we changed
+    for k in new_overrides:
+        if k in saved:
+            app.dependency_overrides[k] = saved[k]
+        else:
+            app.dependency_overrides.pop(k, None)
 
 
 # ---- Tests ----
-# All tests now take the `client` fixture as an argument.
+# All tests take conftest's session-wide `test_client` directly: conftest's `client`
+# would install the get_db override, useless here since get_product_service is mocked.
 
-def test_health(client):
-    r = client.get("/health")
+def test_health(test_client):
+    r = test_client.get("/health")
     assert r.status_code == 200
     assert r.json()["status"] == "ok"
 
 
-def test_metrics(client):
-    r = client.get("/metrics")
+def test_metrics(test_client):
+    r = test_client.get("/metrics")
     assert r.status_code == 200
     assert "http_requests_total" in r.text
 
 
-def test_create_product(client):
-    r = client.post("/products/", json={"sku": "S1", "name": "X", "price": 10.0, "quantity": 1})
+def test_create_product(test_client):
+    r = test_client.post("/products/", json={"sku": "S1", "name": "X", "price": 10.0, "quantity": 1})
     assert r.status_code == 201
     # We can access the mock through the dependency override if needed
     mock_service = app.dependency_overrides[product_routes.get_product_service]()
     mock_service.create.assert_awaited()
 
 
-def test_list_products(client):
-    r = client.get("/products/")
+def test_list_products(test_client):
+    r = test_client.get("/products/")
     assert r.status_code == 200
     assert isinstance(r.json(), list)
 
 
-def test_read_product(client):
-    r = client.get("/products/1")
+def test_read_product(test_client):
+    r = test_client.get("/products/1")
     assert r.status_code == 200
     mock_service = app.dependency_overrides[product_routes.get_product_service]()
     mock_service.get.assert_called_with(1)
 
 
-def test_read_not_found(client):
+def test_read_not_found(test_client):
     mock_service = app.dependency_overrides[product_routes.get_product_service]()
     mock_service.get.side_effect = product_service.NotFoundError()
-    r = client.get("/products/99")
+    r = test_client.get("/products/99")
     assert r.status_code == 404
 
 
-def test_update_product(client):
-    r = client.put("/products/1", json={"name": "Updated"})
+def test_update_product(test_client):
+    r = test_client.put("/products/1", json={"name": "Updated"})
     assert r.status_code == 200
     mock_service = app.dependency_overrides[product_routes.get_product_service]()
     mock_service.update.assert_awaited()
 
 
-def test_update_conflict(client):
+def test_update_conflict(test_client):
     mock_service = app.dependency_overrides[product_routes.get_product_service]()
     mock_service.update.side_effect = product_service.ConcurrencyConflictError()
-    r = client.put("/products/1", json={"name": "Updated"})
+    r = test_client.put("/products/1", json={"name": "Updated"})
     assert r.status_code == 409
 
 
-def test_delete_product(client):
-    r = client.delete("/products/1")
+def test_delete_product(test_client):
+    r = test_client.delete("/products/1")
     assert r.status_code == 200
     mock_service = app.dependency_overrides[product_routes.get_product_service]()
     mock_service.delete.assert_awaited()
 
 
-def test_delete_not_found(client):
+def test_delete_not_found(test_client):
     mock_service = app.dependency_overrides[product_routes.get_product_service]()
     mock_service.delete.side_effect = product_service.NotFoundError()
-    r = client.delete("/products/1")
+    r = test_client.delete("/products/1")
     assert r.status_code == 404
 
 
-def test_read_by_sku(client):
-    r = client.get("/products/sku/S1")
+def test_read_by_sku(test_client):
+    r = test_client.get("/products/sku/S1")
     assert r.status_code == 200
     mock_service = app.dependency_overrides[product_routes.get_product_service]()
     mock_service.get_by_sku.assert_called()
 
 
-def test_adjust_stock(client):
-    r = client.patch("/products/1/stock", json={"delta": 5})
+def test_adjust_stock(test_client):
+    r = test_client.patch("/products/1/stock", json={"delta": 5})
     assert r.status_code == 200
     mock_service = app.dependency_overrides[product_routes.get_product_service]()
     mock_service.adjust_stock.assert_awaited_with(1, 5)
 
 
-def test_set_active(client):
-    r = client.patch("/products/1/active", json={"is_active": False})
+def test_set_active(test_client):
+    r = test_client.patch("/products/1/active", json={"is_active": False})
     assert r.status_code == 200
     mock_service = app.dependency_overrides[product_routes.get_product_service]()
     mock_service.set_active.assert_awaited_with(1, False)
 
 
 @pytest.mark.asyncio
-async def test_create_conflict(client):
+async def test_create_conflict(test_client):
     mock_service = app.dependency_overrides[product_routes.get_product_service]()
     mock_service.create.side_effect = product_service.SKUAlreadyExistsError()
-    r = client.post("/products/", json={"sku": "S1", "name": "X", "price": 10.0, "quantity": 1})
+    r = test_client.post("/products/", json={"sku": "S1", "name": "X", "price": 10.0, "quantity": 1})
     assert r.status_code == 409
 
-def test_update_if_match_invalid(client):
-    r = client.put("/products/1", json={"name": "X"}, headers={"If-Match": "abc"})
+def test_update_if_match_invalid(test_client):
+    r = test_client.put("/products/1", json={"name": "X"}, headers={"If-Match": "abc"})
     assert r.status_code == 400
     assert r.json()["detail"] == "If-Match doit être un entier"
 
 @pytest.mark.asyncio
-async def test_update_not_found(client):
+async def test_update_not_found(test_client):
     mock_service = app.dependency_overrides[product_routes.get_product_service]()
     mock_service.update.side_effect = product_service.NotFoundError()
-    r = client.put("/products/1", json={"name": "X"})
+    r = test_client.put("/products/1", json={"name": "X"})
     assert r.status_code == 404
 
 @pytest.mark.asyncio
-async def test_update_sku_conflict(client):
+async def test_update_sku_conflict(test_client):
     mock_service = app.dependency_overrides[product_routes.get_product_service]()
     mock_service.update.side_effect = product_service.SKUAlreadyExistsError()
-    r = client.put("/products/1", json={"name": "X"})
+    r = test_client.put("/products/1", json={"name": "X"})
     assert r.status_code == 409
 
-def test_read_by_sku_not_found(client):
+def test_read_by_sku_not_found(test_client):
     mock_service = app.dependency_overrides[product_routes.get_product_service]()
     mock_service.get_by_sku.return_value = None
-    r = client.get("/products/sku/doesnotexist")
+    r = test_client.get("/products/sku/doesnotexist")
     assert r.status_code == 404
 
 @pytest.mark.asyncio
-async def test_adjust_stock_not_found(client):
+async def test_adjust_stock_not_found(test_client):
     mock_service = app.dependency_overrides[product_routes.get_product_service]()
     mock_service.adjust_stock.side_effect = product_service.NotFoundError()
-    r = client.patch("/products/1/stock", json={"delta": 5})
+    r = test_client.patch("/products/1/stock", json={"delta": 5})
     assert r.status_code == 404
 
 
 @pytest.mark.asyncio
-async def test_adjust_stock_conflict(client):
+async def test_adjust_stock_conflict(test_client):
     mock_service = app.dependency_overrides[product_routes.get_product_service]()
     mock_service.adjust_stock.side_effect = product_service.InsufficientStockError()
-    r = client.patch("/products/1/stock", json={"delta": -10})
+    r = test_client.patch("/products/1/stock", json={"delta": -10})
     assert r.status_code == 409
 
 
 @pytest.mark.asyncio
-async def test_set_active_not_found(client):
+async def test_set_active_not_found(test_client):
     mock_service = app.dependency_overrides[product_routes.get_product_service]()
     mock_service.set_active.side_effect = product_service.NotFoundError()
-    r = client.patch("/products/1/active", json={"is_active": True})
+    r = test_client.patch("/products/1/active", json={"is_active": True})
     assert r.status_code == 404
\ No newline at end of file